@@ -2,113 +2,172 @@ import asyncio
 import json
 import os
 import re # For regular expressions
+import string
 import unicodedata # For sanitizing filenames
+from functools import lru_cache
 from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
 import logging
 import aiohttp # For downloading images asynchronously
+import aiofiles # For writing downloaded images without blocking the event loop
+try:
+    import orjson # Optional: faster pretty-printing of large debug JSON dumps
+except ImportError:
+    orjson = None
 
 # --- Configuration for Debugging & Downloading ---
 SAVE_DEBUG_FILES = True
 DEBUG_FILE_PREFIX = "gm_debug"
 MAIN_DOWNLOAD_DIR = "downloaded_google_maps_images" # Main folder for all downloaded images
 MAX_PLACES_TO_PROCESS = 3
+PLACE_PAGE_POOL_SIZE = 3 # Number of browser pages used to process places concurrently
+MAX_CONCURRENT_DOWNLOADS = 32 # Upper bound on in-flight image downloads across all places
+SMALL_IMAGE_MAX_BYTES = 1_000_000 # Downloads with a known Content-Length below this are read in one go
 # --- End Configuration ---
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Known Google image hosts
-IMAGE_HOSTS_REGEX = re.compile(
-    r'(?:https?:)?//(?:lh[3-6]\.googleusercontent\.com|[^/]+\.ggpht\.com|[^/]+\.googleusercontent\.com/profile/picture)/[a-zA-Z0-9\-_./=&?%]+'
+# Known Google image hosts, split so neither pattern has an unbounded host part to backtrack over.
+# lhN.googleusercontent.com is by far the most common host on Maps, so it is tried first.
+_LH_URL_REGEX = re.compile(
+    r'(?:https?:)?//lh[3-6]\.googleusercontent\.com/[a-zA-Z0-9\-_./=&?%]+\Z'
 )
+_GGPHT_URL_REGEX = re.compile(
+    r'(?:https?:)?//[a-zA-Z0-9\-]+\.(?:ggpht\.com|googleusercontent\.com/profile/picture)/[a-zA-Z0-9\-_./=&?%]+\Z'
+)
+# Shortest string either host pattern can match ("//a.ggpht.com/x")
+_MIN_IMAGE_URL_LENGTH = 15
 # Filter to exclude very small, icon-like images
 TINY_IMAGE_PARAM_REGEX = re.compile(r'[=&?]s(?:1[6-9]|[2-6]\d)($|\W)')
-
+# URL whose first size parameter ("=sNN" or "/sNN") anywhere in it is below 100px; used on profile pictures
+_FIRST_SIZE_PARAM_SMALL_RE = re.compile(r'(?:(?![=/]s\d).)*[=/]s0*\d{1,2}(?!\d)', re.DOTALL)
+# Trailing size/crop suffix on googleusercontent URLs (e.g. "=s1600" or "=w400-h300-k")
+_URL_SIZE_SUFFIX_RE = re.compile(r'=[swh]\d+(-[wh]\d+)?(-[a-zA-Z0-9]+)?$')
+# sanitize_filename works on ASCII-only text: whitespace and path/shell-unsafe characters become '_',
+# letters, digits, '-' and '_' are kept, and everything else is dropped, all in one str.translate pass.
+_SANITIZE_UNSAFE_CHARS = '/\\:*?"<>|;,&'
+_SANITIZE_ALLOWED_CHARS = set(string.ascii_letters + string.digits + '-_')
+_SANITIZE_TRANSLATION = {
+    code: ('_' if chr(code).isspace() or chr(code) in _SANITIZE_UNSAFE_CHARS else chr(code) if chr(code) in _SANITIZE_ALLOWED_CHARS else None)
+    for code in range(128)
+}
+_SANITIZE_COLLAPSE_RE = re.compile(r'([_-])\1+')
+
+# Runs in the page: parses APP_INITIALIZATION_STATE[3][6] there and returns only the place details and
+# the strings that mention an image host, so the multi-MB payload never crosses the CDP connection.
+# The candidates are validated in Python by _maybe_add_url.
+EXTRACT_PLACE_DATA_JS = r"""() => {
+    let state;
+    try { state = window.APP_INITIALIZATION_STATE[3][6]; } catch (e) { return null; }
+    if (!state) return null;
+    if (typeof state === 'string') {
+        if (state.startsWith(")]}'\n")) state = state.slice(4);
+        try { state = JSON.parse(state); } catch (e) { return {parse_error: String(e)}; }
+    }
+    const candidates = new Set();
+    // Children are pushed in reverse so candidates come out in document order
+    const stack = [state];
+    while (stack.length) {
+        const node = stack.pop();
+        if (typeof node === 'string') {
+            if (node.includes('googleusercontent.com') || node.includes('ggpht.com')) candidates.add(node);
+        } else if (Array.isArray(node)) {
+            for (let i = node.length - 1; i >= 0; i--) stack.push(node[i]);
+        } else if (node && typeof node === 'object') {
+            const values = Object.values(node);
+            for (let i = values.length - 1; i >= 0; i--) stack.push(values[i]);
+        }
+    }
+    let darray = state;
+    for (const i of [1, 11, 0, 0]) darray = Array.isArray(darray) && i < darray.length ? darray[i] : null;
+    const details = Array.isArray(darray) && darray.length
+        ? {title: darray.length > 1 ? darray[1] : null, address: darray.length > 2 ? darray[2] : null}
+        : null;
+    return {details: details, candidate_urls: Array.from(candidates)};
+}"""
+
+
+_CREATED_DIRS = set() # Directories already ensured during this run
 
 def ensure_dir_exists(dir_path):
-    if not os.path.exists(dir_path):
+    if dir_path in _CREATED_DIRS: return
+    try:
         os.makedirs(dir_path)
         logger.info(f"Created directory: {dir_path}")
+    except FileExistsError:
+        pass
+    _CREATED_DIRS.add(dir_path)
+
+_http_session = None
+_http_session_loop = None # Event loop the shared session was created on
+
+def get_http_session():
+    """Returns the shared aiohttp session for the running event loop, so repeated download runs on one loop reuse its connections."""
+    global _http_session, _http_session_loop
+    loop = asyncio.get_running_loop()
+    if _http_session is None or _http_session.closed or _http_session_loop is not loop:
+        # A session from an earlier (possibly closed) loop can't be used or cleanly closed here; just replace it
+        connector = aiohttp.TCPConnector(limit=64, limit_per_host=16, ttl_dns_cache=300, keepalive_timeout=30)
+        _http_session = aiohttp.ClientSession(connector=connector)
+        _http_session_loop = loop
+    return _http_session
+
+async def close_http_session():
+    global _http_session, _http_session_loop
+    if _http_session is not None and not _http_session.closed and _http_session_loop is asyncio.get_running_loop():
+        await _http_session.close()
+    _http_session = None
+    _http_session_loop = None
 
 def get_debug_filepath(filename_suffix):
     debug_dir = os.path.join(os.getcwd(), "debug_output")
     ensure_dir_exists(debug_dir)
     return os.path.join(debug_dir, f"{DEBUG_FILE_PREFIX}_{filename_suffix}")
 
+# Blocking debug writers; call them through asyncio.to_thread so large dumps don't stall the event loop.
+def _write_debug_text(filepath, text):
+    with open(filepath, "w", encoding="utf-8") as f: f.write(text)
+
+def _write_debug_json(filepath, data):
+    if orjson is not None:
+        with open(filepath, "wb") as f: f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+    else:
+        with open(filepath, "w", encoding="utf-8") as f: json.dump(data, f, indent=2)
+
+@lru_cache(maxsize=1024)
 def sanitize_filename(name: str, max_length: int = 200) -> str:
     """Sanitizes a string to be used as a valid filename/directory name."""
     if not name or not name.strip():
         name = "unknown_place"
     name = unicodedata.normalize('NFKD', name).encode('ascii', 'ignore').decode('ascii')
-    name = re.sub(r'[\s/\\:\*\?"<>\|;,&]+', '_', name)
-    name = re.sub(r'[^\w\-_]', '', name)
-    name = re.sub(r'__+', '_', name)
-    name = re.sub(r'--+', '-', name)
+    name = name.translate(_SANITIZE_TRANSLATION)
+    name = _SANITIZE_COLLAPSE_RE.sub(r'\1', name)
     name = name.strip('_-')
     if not name:
         name = "sanitized_unknown_place"
     return name[:max_length]
 
 
-def get_nested_value(data, path, default=None):
-    current = data
-    for i, key_or_index in enumerate(path):
-        if isinstance(key_or_index, int):
-            if isinstance(current, list) and 0 <= key_or_index < len(current):
-                current = current[key_or_index]
-            else: return default
-        elif isinstance(key_or_index, str):
-            if isinstance(current, dict) and key_or_index in current:
-                current = current[key_or_index]
-            else: return default
-        else: return default
-    return current
-
-def find_image_urls_recursively(data_structure, found_urls_set):
-    if isinstance(data_structure, dict):
-        for key, value in data_structure.items():
-            if isinstance(value, str):
-                match = IMAGE_HOSTS_REGEX.fullmatch(value)
-                if match:
-                    url_to_add = match.group(0)
-                    if url_to_add.startswith('//'): url_to_add = 'https:' + url_to_add
-                    if not TINY_IMAGE_PARAM_REGEX.search(url_to_add):
-                        is_profile_pic = "/profile/picture/" in url_to_add
-                        is_small_sized_profile_pic = False
-                        if is_profile_pic:
-                            size_match = re.search(r"[=/]s(\d+)", url_to_add)
-                            if size_match and int(size_match.group(1)) < 100:
-                                is_small_sized_profile_pic = True
-                        if not is_small_sized_profile_pic:
-                            found_urls_set.add(url_to_add)
-            else: find_image_urls_recursively(value, found_urls_set)
-    elif isinstance(data_structure, list):
-        for item in data_structure:
-            if isinstance(item, str):
-                match = IMAGE_HOSTS_REGEX.fullmatch(item)
-                if match:
-                    url_to_add = item
-                    if url_to_add.startswith('//'): url_to_add = 'https:' + url_to_add
-                    if not TINY_IMAGE_PARAM_REGEX.search(url_to_add):
-                        is_profile_pic = "/profile/picture/" in url_to_add
-                        is_small_sized_profile_pic = False
-                        if is_profile_pic:
-                            size_match = re.search(r"[=/]s(\d+)", url_to_add)
-                            if size_match and int(size_match.group(1)) < 100:
-                                is_small_sized_profile_pic = True
-                        if not is_small_sized_profile_pic:
-                            found_urls_set.add(url_to_add)
-            else: find_image_urls_recursively(item, found_urls_set)
+def _maybe_add_url(value, found_urls):
+    if len(value) < _MIN_IMAGE_URL_LENGTH: return
+    # Most strings in the payload are not URLs; a substring test rejects them far cheaper than the regex.
+    if 'googleusercontent.com' not in value and 'ggpht.com' not in value: return
+    match = _LH_URL_REGEX.match(value) or _GGPHT_URL_REGEX.match(value)
+    if not match: return
+    url_to_add = match.group(0)
+    if url_to_add.startswith('//'): url_to_add = 'https:' + url_to_add
+    if TINY_IMAGE_PARAM_REGEX.search(url_to_add): return
+    if "/profile/picture/" in url_to_add and _FIRST_SIZE_PARAM_SMALL_RE.match(url_to_add): return
+    # Store the URL without its size suffix so size variants of one image collapse to a single download
+    size_suffix_match = _URL_SIZE_SUFFIX_RE.search(url_to_add)
+    if size_suffix_match: url_to_add = url_to_add[:size_suffix_match.start()]
+    found_urls[url_to_add] = None
 
 async def download_image(session: aiohttp.ClientSession, url: str, folder_path: str, image_counter: int):
     try:
-        url_no_size = re.sub(r'=[swh]\d+(-[wh]\d+)?(-[a-zA-Z0-9]+)?$', '', url)
-        if url_no_size != url:
-            logger.debug(f"        Attempting download from modified URL: {url_no_size} (original: {url})")
-        else:
-            logger.debug(f"        Attempting download from URL: {url}")
+        logger.debug(f"        Attempting download from URL: {url}")
 
-        async with session.get(url_no_size, timeout=30, allow_redirects=True) as response:
+        async with session.get(url, timeout=30, allow_redirects=True) as response:
             response.raise_for_status()
             content_type = response.headers.get('Content-Type', '').lower()
             ext = '.jpg'
@@ -123,23 +182,31 @@ async def download_image(session: aiohttp.ClientSession, url: str, folder_path:
                     if potential_ext in ['.jpg', '.jpeg', '.png', '.gif', '.webp']: ext = potential_ext
             image_filename = f"image_{image_counter:03d}{ext}"
             filepath = os.path.join(folder_path, image_filename)
-            with open(filepath, 'wb') as f:
-                while True:
-                    chunk = await response.content.read(8192)
-                    if not chunk: break
-                    f.write(chunk)
-            logger.info(f"      Successfully downloaded: {url_no_size} -> {filepath}")
+            content_length = response.content_length
+            async with aiofiles.open(filepath, 'wb') as f:
+                if content_length and content_length < SMALL_IMAGE_MAX_BYTES:
+                    # Small images (thumbnails, avatars): one read and one write instead of a chunk loop
+                    await f.write(await response.read())
+                else:
+                    async for chunk in response.content.iter_chunked(65536):
+                        await f.write(chunk)
+            logger.info(f"      Successfully downloaded: {url} -> {filepath}")
             return True
-    except aiohttp.ClientError as e: logger.error(f"      AIOHTTP ClientError downloading {url_no_size}: {e}")
-    except asyncio.TimeoutError: logger.error(f"      Timeout downloading {url_no_size}")
-    except Exception as e: logger.error(f"      Error downloading {url_no_size}: {e}", exc_info=False)
+    except aiohttp.ClientError as e: logger.error(f"      AIOHTTP ClientError downloading {url}: {e}")
+    except asyncio.TimeoutError: logger.error(f"      Timeout downloading {url}")
+    except Exception as e: logger.error(f"      Error downloading {url}: {e}", exc_info=False)
     return False
 
+# Resource types the scraper never reads; documents and scripts must load since they carry APP_INITIALIZATION_STATE
+BLOCKED_RESOURCE_TYPES = {"image", "media", "font", "stylesheet"}
+
+async def _block_unneeded_resources(route):
+    if route.request.resource_type in BLOCKED_RESOURCE_TYPES: await route.abort()
+    else: await route.continue_()
+
 async def extract_images_for_place(page, place_url, place_index=0):
     logger.info(f"  Processing Place {place_index + 1}: Navigating to {place_url}")
     place_data_to_return = {"title": None, "address": None, "image_urls": [], "place_url": place_url}
-    raw_json_data_str = None
-    json_data_obj = None
 
     try:
         await page.goto(place_url, wait_until='domcontentloaded', timeout=60000)
@@ -152,53 +219,38 @@ async def extract_images_for_place(page, place_url, place_index=0):
             logger.warning(f"    Place {place_index + 1}: Key element '{place_title_selector}' not found after 20s.")
             if SAVE_DEBUG_FILES: await page.screenshot(path=get_debug_filepath(f"place_{place_index+1}_key_element_timeout.png"))
 
-        for attempt in range(3):
-            logger.info(f"    Place {place_index + 1}: Attempting to extract APP_INITIALIZATION_STATE (Attempt {attempt + 1}/3)...")
-            js_expression = "() => { try { return window.APP_INITIALIZATION_STATE[3][6]; } catch (e) { return null; } }"
-            evaluated_data = await page.evaluate(js_expression)
-            
-            if evaluated_data:
-                if isinstance(evaluated_data, str):
-                    raw_json_data_str = evaluated_data
-                    logger.info(f"    Place {place_index + 1}: JS evaluate returned a STRING. Attempting to parse after stripping prefix.")
-                    current_json_string = raw_json_data_str[4:] if raw_json_data_str.startswith(")]}'\n") else raw_json_data_str
-                    try:
-                        json_data_obj = json.loads(current_json_string)
-                        logger.info(f"    Place {place_index + 1}: Successfully PARSED string on attempt {attempt + 1}.")
-                        break
-                    except json.JSONDecodeError as jde:
-                        logger.error(f"    Place {place_index + 1}: JSONDecodeError on attempt {attempt + 1}: {jde}. Raw string (first 100 chars): {current_json_string[:100]}")
-                        json_data_obj = None
-                else:
-                    json_data_obj = evaluated_data
-                    logger.info(f"    Place {place_index + 1}: JS evaluate returned an OBJECT/ARRAY on attempt {attempt + 1}.")
-                    break
-            
-            if not evaluated_data: logger.warning(f"    Place {place_index + 1}: APP_INITIALIZATION_STATE not directly found by JS evaluate on attempt {attempt + 1}.")
-            if attempt < 2: logger.warning(f"    Waiting 3s before retry..."); await asyncio.sleep(3)
+        logger.info(f"    Place {place_index + 1}: Waiting for APP_INITIALIZATION_STATE to be populated...")
+        try:
+            await page.wait_for_function("() => { try { return !!window.APP_INITIALIZATION_STATE[3][6]; } catch (e) { return false; } }", timeout=9000)
+        except PlaywrightTimeoutError:
+            logger.warning(f"    Place {place_index + 1}: APP_INITIALIZATION_STATE[3][6] not populated after 9s.")
 
+        extracted = await page.evaluate(EXTRACT_PLACE_DATA_JS)
         if SAVE_DEBUG_FILES:
-            await page.screenshot(path=get_debug_filepath(f"place_{place_index+1}_page_after_js_attempts.png"))
-            if raw_json_data_str:
-                 with open(get_debug_filepath(f"place_{place_index+1}_RAW_APP_INIT_STATE_3_6.json"), "w", encoding="utf-8") as f: f.write(raw_json_data_str)
+            await page.screenshot(path=get_debug_filepath(f"place_{place_index+1}_page_after_js_evaluate.png"))
+        # Only pull the full multi-MB payload over CDP for the debug dump when browser-side extraction failed
+        if SAVE_DEBUG_FILES and (not extracted or extracted.get("parse_error") or not extracted.get("details")):
+            js_expression = "() => { try { return window.APP_INITIALIZATION_STATE[3][6]; } catch (e) { return null; } }"
+            evaluated_data = await page.evaluate(js_expression)
+            if evaluated_data and isinstance(evaluated_data, str):
+                 await asyncio.to_thread(_write_debug_text, get_debug_filepath(f"place_{place_index+1}_RAW_APP_INIT_STATE_3_6.json"), evaluated_data)
                  logger.info(f"    Place {place_index + 1}: Saved RAW string from APP_INITIALIZATION_STATE[3][6]")
-            elif json_data_obj :
-                with open(get_debug_filepath(f"place_{place_index+1}_PARSED_APP_INIT_STATE_3_6.json"), "w", encoding="utf-8") as f: json.dump(json_data_obj, f, indent=2)
+            elif evaluated_data:
+                await asyncio.to_thread(_write_debug_json, get_debug_filepath(f"place_{place_index+1}_PARSED_APP_INIT_STATE_3_6.json"), evaluated_data)
                 logger.info(f"    Place {place_index + 1}: Saved PARSED object from APP_INITIALIZATION_STATE[3][6]")
-            else: logger.error(f"    Place {place_index + 1}: APP_INITIALIZATION_STATE data is null/empty after all attempts. Cannot save JSON.")
-
-        if json_data_obj:
-            logger.debug(f"    Place {place_index + 1}: Type of json_data_obj: {type(json_data_obj)}")
-            if isinstance(json_data_obj, list): logger.debug(f"    Place {place_index + 1}: json_data_obj is a LIST. Length: {len(json_data_obj)}")
-            
-            darray = get_nested_value(json_data_obj, [1, 11, 0, 0]) # Corrected based on user's JSON file
-            if darray:
-                logger.info(f"    Place {place_index + 1}: Successfully extracted 'darray' (from json_data_obj[1][11][0][0]).")
-                title_val = get_nested_value(darray, [1]) # Corrected
+            else: logger.error(f"    Place {place_index + 1}: APP_INITIALIZATION_STATE data is null/empty. Cannot save JSON.")
+
+        if extracted and extracted.get("parse_error"):
+            logger.error(f"    Place {place_index + 1}: Failed to parse APP_INITIALIZATION_STATE[3][6] in the browser: {extracted['parse_error']}")
+        elif extracted:
+            details = extracted.get("details")
+            if details:
+                logger.info(f"    Place {place_index + 1}: Successfully extracted 'darray' (from APP_INITIALIZATION_STATE[3][6][1][11][0][0]).")
+                title_val = details.get("title")
                 if title_val and isinstance(title_val, str): place_data_to_return["title"] = title_val.strip()
                 else: logger.warning(f"      Title not found/string at darray[1]. Type: {type(title_val)}")
                 
-                addr_list = get_nested_value(darray, [2]) # Corrected (address is a list of parts)
+                addr_list = details.get("address") # Address is a list of parts
                 if addr_list and isinstance(addr_list, list):
                     address_parts = [str(part) for part in addr_list if part is not None]
                     cleaned_addr = ", ".join(address_parts).strip()
@@ -212,17 +264,18 @@ async def extract_images_for_place(page, place_url, place_index=0):
                     logger.warning(f"      Address not found or not a list at darray[2]. Type: {type(addr_list)}")
                 logger.info(f"      Place {place_index + 1}: Title: '{place_data_to_return['title']}', Address: '{place_data_to_return['address']}'")
             else:
-                logger.warning(f"    Place {place_index + 1}: 'darray' (expected at json_data_obj[1][11][0][0]) is STILL missing or None. Title/Address extraction will fail.")
-
-            logger.info(f"    Place {place_index + 1}: Starting recursive search for image URLs in the entire json_data_obj...")
-            image_urls_found_recursively = set()
-            find_image_urls_recursively(json_data_obj, image_urls_found_recursively)
-            place_data_to_return["image_urls"] = sorted(list(image_urls_found_recursively))
-            logger.info(f"    Place {place_index + 1}: Recursive search found {len(place_data_to_return['image_urls'])} potential image URLs.")
+                logger.warning(f"    Place {place_index + 1}: 'darray' (expected at APP_INITIALIZATION_STATE[3][6][1][11][0][0]) is missing or None. Title/Address extraction will fail.")
+
+            candidate_urls = extracted.get("candidate_urls") or []
+            logger.info(f"    Place {place_index + 1}: Browser-side walk returned {len(candidate_urls)} candidate image URL string(s). Filtering...")
+            image_urls_found = {} # dict as an insertion-ordered set
+            for candidate_url in candidate_urls: _maybe_add_url(candidate_url, image_urls_found)
+            place_data_to_return["image_urls"] = list(image_urls_found)
+            logger.info(f"    Place {place_index + 1}: Filtering kept {len(place_data_to_return['image_urls'])} potential image URLs.")
             if not place_data_to_return["image_urls"]:
-                 logger.warning(f"    Place {place_index + 1}: Recursive search did not find any image URLs matching patterns.")
+                 logger.warning(f"    Place {place_index + 1}: Search did not find any image URLs matching patterns.")
         else: 
-             logger.error(f"    Place {place_index + 1}: No json_data_obj to process for details or images.")
+             logger.error(f"    Place {place_index + 1}: APP_INITIALIZATION_STATE not found. No data to process for details or images.")
     except PlaywrightTimeoutError as pte:
         logger.error(f"    Place {place_index + 1}: Main navigation or key element timeout for {place_url}: {pte}")
         if SAVE_DEBUG_FILES: await page.screenshot(path=get_debug_filepath(f"place_{place_index+1}_nav_timeout_error.png"))
@@ -249,6 +302,7 @@ async def get_google_maps_images_data(query: str):
             java_script_enabled=True, accept_downloads=False, bypass_csp=False
         )
         await context.add_init_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+        await context.route("**/*", _block_unneeded_resources)
         page = await context.new_page()
         logger.info(f"Browser launched. Navigating to Google Maps for query: '{query}'")
 
@@ -293,7 +347,7 @@ async def get_google_maps_images_data(query: str):
 
             if SAVE_DEBUG_FILES:
                 await page.screenshot(path=get_debug_filepath("after_search_and_wait.png"))
-                with open(get_debug_filepath("after_search_and_wait.html"), "w", encoding="utf-8") as f: f.write(await page.content())
+                await asyncio.to_thread(_write_debug_text, get_debug_filepath("after_search_and_wait.html"), await page.content())
 
             place_urls_to_process = []
             if "/maps/place/" in page.url:
@@ -306,43 +360,35 @@ async def get_google_maps_images_data(query: str):
                     await page.wait_for_selector(feed_selector, timeout=30000)
                     logger.info(f"  Search results feed ('{feed_selector}') loaded.")
                     
-                    place_link_elements = await page.locator(f'{feed_selector} div[jsaction] a[href*="/maps/place/"]').all()
-                    if not place_link_elements:
+                    # Read href, aria-label and text for every link in one round-trip instead of three per link
+                    read_links_js = "els => els.map(a => ({href: a.getAttribute('href'), aria_label: a.getAttribute('aria-label') || '', inner_text: (a.innerText || '').trim()}))"
+                    place_links = await page.locator(f'{feed_selector} div[jsaction] a[href*="/maps/place/"]').evaluate_all(read_links_js)
+                    if not place_links:
                         logger.info("  Specific feed link selector found no elements, trying broader link search...")
-                        place_link_elements = await page.locator('a[href*="/maps/place/"]').all()
+                        place_links = await page.locator('a[href*="/maps/place/"]').evaluate_all(read_links_js)
                         
-                    logger.info(f"  Found {len(place_link_elements)} potential place link elements.")
+                    logger.info(f"  Found {len(place_links)} potential place link elements.")
                     
                     processed_links_count = 0
                     unique_hrefs = set()
-                    for link_el in place_link_elements:
-                        full_url = None # Initialize full_url for each link element
+                    for link in place_links:
                         if processed_links_count >= MAX_PLACES_TO_PROCESS:
                             logger.info(f"  Reached MAX_PLACES_TO_PROCESS limit ({MAX_PLACES_TO_PROCESS})."); break
-                        try:
-                            href = await link_el.get_attribute('href')
-                            aria_label = await link_el.get_attribute('aria-label') or ""
-                            inner_text = (await link_el.inner_text() or "").strip()
-                            
-                            if href and (aria_label or inner_text):
-                                full_url = href if href.startswith("http") else f"https://www.google.com{href}"
-                                
-                                if full_url and full_url not in unique_hrefs: 
-                                    logger.debug(f"    Adding valid place link: {full_url} (Label: '{aria_label}', Text: '{inner_text}')")
-                                    place_urls_to_process.append(full_url)
-                                    unique_hrefs.add(full_url)
-                                    processed_links_count += 1
-                                elif not full_url: 
-                                    logger.warning(f"    Skipping link as full_url was not properly constructed. href: '{href}'")
-                        except Exception as el_ex: 
-                            logger.error(f"    Error processing a potential link element: {el_ex}")
+                        href, aria_label, inner_text = link["href"], link["aria_label"], link["inner_text"]
+                        if href and (aria_label or inner_text):
+                            full_url = href if href.startswith("http") else f"https://www.google.com{href}"
+                            if full_url not in unique_hrefs: 
+                                logger.debug(f"    Adding valid place link: {full_url} (Label: '{aria_label}', Text: '{inner_text}')")
+                                place_urls_to_process.append(full_url)
+                                unique_hrefs.add(full_url)
+                                processed_links_count += 1
                     if not place_urls_to_process: logger.warning("  No valid place URLs extracted from feed after filtering.")
 
                 except PlaywrightTimeoutError:
                     logger.error(f"  Timeout waiting for search results feed ('{feed_selector}').")
                     if SAVE_DEBUG_FILES:
                         await page.screenshot(path=get_debug_filepath("feed_timeout_error.png"))
-                        with open(get_debug_filepath("feed_timeout_error.html"), "w", encoding="utf-8") as f_timeout: f_timeout.write(await page.content())
+                        await asyncio.to_thread(_write_debug_text, get_debug_filepath("feed_timeout_error.html"), await page.content())
                     if "/maps/place/" in page.url: 
                         logger.info("  Although feed timed out, current URL is a place page. Processing this page."); place_urls_to_process.append(page.url)
                     else: logger.warning("  No results feed and not a direct place page.")
@@ -350,14 +396,26 @@ async def get_google_maps_images_data(query: str):
             if not place_urls_to_process: logger.warning("No place URLs identified to process.")
             else: logger.info(f"Will process {len(place_urls_to_process)} place(s) for images.")
 
-            for i, place_url in enumerate(place_urls_to_process):
-                place_info = await extract_images_for_place(page, place_url, place_index=i)
-                if place_info and (place_info.get("title") or place_info.get("address") or place_info.get("image_urls")):
+            # Fan place extraction out over a small pool of pages; the queue bounds concurrency.
+            page_pool = asyncio.Queue()
+            pool_size = min(max(1, PLACE_PAGE_POOL_SIZE), len(place_urls_to_process)) # At least one page, or every task would wait forever
+            if pool_size: page_pool.put_nowait(page)
+            for _ in range(pool_size - 1): page_pool.put_nowait(await context.new_page())
+
+            async def extract_with_pooled_page(place_url, place_index):
+                pooled_page = await page_pool.get()
+                try: return await extract_images_for_place(pooled_page, place_url, place_index=place_index)
+                finally: page_pool.put_nowait(pooled_page)
+
+            # return_exceptions keeps the places that finished if another place's task raises
+            place_results = await asyncio.gather(*(extract_with_pooled_page(place_url, i) for i, place_url in enumerate(place_urls_to_process)), return_exceptions=True)
+            for i, (place_url, place_info) in enumerate(zip(place_urls_to_process, place_results)):
+                if isinstance(place_info, BaseException):
+                    logger.error(f"  Extraction failed for place {i+1} ({place_url}): {place_info!r}")
+                elif place_info and (place_info.get("title") or place_info.get("address") or place_info.get("image_urls")):
                     all_places_data.append(place_info)
                 else:
                      logger.warning(f"  No significant data extracted for place {i+1} ({place_url}), not adding to results list.")
-                if i < len(place_urls_to_process) - 1:
-                    logger.info(f"  Pausing for 1 second before next place..."); await asyncio.sleep(1)
         except PlaywrightTimeoutError as pte:
             logger.error(f"Major timeout during main navigation or search for '{query}': {pte}")
             if SAVE_DEBUG_FILES: await page.screenshot(path=get_debug_filepath("major_timeout_error.png"))
@@ -405,29 +463,46 @@ async def main_with_downloads():
 
         logger.info("\n--- Starting Image Downloads ---")
         ensure_dir_exists(MAIN_DOWNLOAD_DIR)
-        async with aiohttp.ClientSession() as http_session:
-            for place_idx, place_info in enumerate(extracted_data):
-                place_title_for_folder = place_info.get('title')
-                if not place_title_for_folder:
-                    place_title_for_folder = f"unknown_place_{place_idx + 1}_{sanitize_filename(place_info.get('place_url', ''))[:30]}"
-                
-                sanitized_folder_name = sanitize_filename(place_title_for_folder)
-                place_folder_path = os.path.join(MAIN_DOWNLOAD_DIR, sanitized_folder_name)
-                ensure_dir_exists(place_folder_path)
-                
-                image_urls_to_dl = place_info.get('image_urls', [])
-                if image_urls_to_dl:
-                    logger.info(f"  Downloading {len(image_urls_to_dl)} images for '{place_title_for_folder}' into '{place_folder_path}'")
-                    download_tasks = []
-                    for img_counter, img_url in enumerate(image_urls_to_dl):
-                        task = download_image(http_session, img_url, place_folder_path, img_counter + 1)
-                        download_tasks.append(task)
-                    if download_tasks:
-                        download_results = await asyncio.gather(*download_tasks)
-                        succeeded_count = sum(1 for r in download_results if r)
-                        logger.info(f"    Finished for '{place_title_for_folder}'. {succeeded_count}/{len(download_tasks)} images downloaded.")
-                else:
-                    logger.info(f"    No image URLs to download for '{place_title_for_folder}'.")
+        # Collect every download up front so all places share one bounded gather.
+        all_downloads = [] # (url, folder_path, image_counter)
+        place_download_ranges = [] # (place_title_for_folder, start_index, count)
+        used_folder_names = set() # Places download concurrently, so two must never share a folder (e.g. chain results)
+        for place_idx, place_info in enumerate(extracted_data):
+            place_title_for_folder = place_info.get('title')
+            if not place_title_for_folder:
+                place_title_for_folder = f"unknown_place_{place_idx + 1}_{sanitize_filename(place_info.get('place_url', ''))[:30]}"
+            
+            sanitized_folder_name = sanitize_filename(place_title_for_folder)
+            if sanitized_folder_name in used_folder_names:
+                base_folder_name, suffix = sanitized_folder_name, place_idx + 1
+                sanitized_folder_name = f"{base_folder_name}_{suffix}"
+                while sanitized_folder_name in used_folder_names:
+                    suffix += 1; sanitized_folder_name = f"{base_folder_name}_{suffix}"
+            used_folder_names.add(sanitized_folder_name)
+            place_folder_path = os.path.join(MAIN_DOWNLOAD_DIR, sanitized_folder_name)
+            ensure_dir_exists(place_folder_path)
+            
+            image_urls_to_dl = place_info.get('image_urls', [])
+            if image_urls_to_dl:
+                logger.info(f"  Queueing {len(image_urls_to_dl)} images for '{place_title_for_folder}' into '{place_folder_path}'")
+                place_download_ranges.append((place_title_for_folder, len(all_downloads), len(image_urls_to_dl)))
+                for img_counter, img_url in enumerate(image_urls_to_dl):
+                    all_downloads.append((img_url, place_folder_path, img_counter + 1))
+            else:
+                logger.info(f"    No image URLs to download for '{place_title_for_folder}'.")
+
+        if all_downloads:
+            download_semaphore = asyncio.Semaphore(max(1, MAX_CONCURRENT_DOWNLOADS)) # A zero-sized semaphore would never admit a download
+            http_session = get_http_session()
+            async def bounded_download(img_url, folder_path, image_counter):
+                async with download_semaphore:
+                    return await download_image(http_session, img_url, folder_path, image_counter)
+
+            logger.info(f"  Downloading {len(all_downloads)} images across {len(place_download_ranges)} place(s)...")
+            download_results = await asyncio.gather(*(bounded_download(*dl) for dl in all_downloads))
+            for place_title_for_folder, start_index, count in place_download_ranges:
+                succeeded_count = sum(1 for r in download_results[start_index:start_index + count] if r)
+                logger.info(f"    Finished for '{place_title_for_folder}'. {succeeded_count}/{count} images downloaded.")
         logger.info(f"--- All image downloads attempted. Check the '{MAIN_DOWNLOAD_DIR}' folder. ---")
     else:
         logger.warning("\nNo data extracted, so no images to download.")
@@ -435,5 +510,11 @@ async def main_with_downloads():
     if SAVE_DEBUG_FILES:
         logger.info(f"Debug files (if any) were saved to '{os.path.join(os.getcwd(), 'debug_output')}' directory.")
 
+async def main():
+    try:
+        await main_with_downloads()
+    finally:
+        await close_http_session()
+
 if __name__ == '__main__':
-    asyncio.run(main_with_downloads())
+    asyncio.run(main())